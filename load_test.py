@@ -0,0 +1,171 @@
+# load_test.py
+"""Async throughput check with a fake LLM, fake embeddings and in-memory Qdrant.
+
+The default executor is pinned to a single thread, so any call that quietly
+falls back to a thread instead of native async stops throughput from scaling.
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import tempfile
+from hashlib import md5
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from qdrant_client import AsyncQdrantClient, QdrantClient
+
+from revisionai_notion import NotionPageLoader
+from revisionai_rag import EMBEDDING_DIM, RevisionRAG
+
+# Roughly a hosted LLM round trip; much lower and the in-memory Qdrant search
+# and chain overhead (~10ms CPU per call) dominate instead of I/O waits.
+LLM_LATENCY = 0.25
+EMBED_LATENCY = 0.05
+NOTION_LATENCY = 0.01
+REQUESTS = 32
+CONCURRENCY_LEVELS = (1, 4, 16, 64)
+
+
+class FakeChatModel(BaseChatModel):
+    latency: float = LLM_LATENCY
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage("ok"))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage("ok"))])
+
+
+class FakeEmbeddings(Embeddings):
+    model_name = "fake-embeddings"
+
+    def _vector(self, text):
+        rng = random.Random(md5(text.encode("utf-8")).hexdigest())
+        return [rng.uniform(-1, 1) for _ in range(EMBEDDING_DIM)]
+
+    def embed_documents(self, texts):
+        time.sleep(EMBED_LATENCY)
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts):
+        await asyncio.sleep(EMBED_LATENCY)
+        return [self._vector(t) for t in texts]
+
+    async def aembed_query(self, text):
+        return (await self.aembed_documents([text]))[0]
+
+
+def fake_notion_transport(pages):
+    rate_limited = set()
+
+    async def handler(request):
+        await asyncio.sleep(NOTION_LATENCY)
+        path = request.url.path
+        if path == "/v1/search":
+            results = [{"id": p["id"], "object": "page"} for p in pages]
+            return httpx.Response(200, json={"results": results})
+
+        page_id = path.split("/")[3]
+        # Every page is rate limited once to exercise the Retry-After path.
+        if (path, page_id) not in rate_limited:
+            rate_limited.add((path, page_id))
+            return httpx.Response(429, headers={"Retry-After": "0"})
+
+        page = next(p for p in pages if p["id"] == page_id)
+        if path.startswith("/v1/pages/"):
+            title = [{"plain_text": page["title"]}]
+            props = {"title": {"type": "title", "title": title}}
+            return httpx.Response(200, json={"properties": props})
+        blocks = [
+            {"type": "paragraph", "paragraph": {"rich_text": [{"plain_text": line}]}}
+            for line in page["content"].split("\n")
+        ]
+        return httpx.Response(200, json={"results": blocks, "has_more": False})
+
+    return httpx.MockTransport(handler)
+
+
+async def measure(label, make_call):
+    print(f"\n{label}")
+    throughputs = {}
+    for concurrency in CONCURRENCY_LEVELS:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited():
+            async with semaphore:
+                await make_call()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(limited() for _ in range(REQUESTS)))
+        throughputs[concurrency] = REQUESTS / (time.perf_counter() - start)
+        print(f"  concurrency={concurrency:>3}  {throughputs[concurrency]:8.1f} req/s")
+
+    assert throughputs[16] > 6 * throughputs[1], "throughput did not scale"
+    return throughputs
+
+
+async def main():
+    loop = asyncio.get_running_loop()
+    loop.set_default_executor(ThreadPoolExecutor(max_workers=1))
+
+    with open(os.path.join(os.path.dirname(__file__), "cached_pages.json")) as f:
+        pages = json.load(f)
+
+    workdir = tempfile.TemporaryDirectory()
+    os.chdir(workdir.name)
+
+    http_client = httpx.AsyncClient(transport=fake_notion_transport(pages))
+    loader = NotionPageLoader("fake-token", http_client=http_client)
+    start = time.perf_counter()
+    synced = await loader.arefresh_and_cache_pages()
+    print(f"Synced {len(synced)} pages in {time.perf_counter() - start:.2f}s")
+    assert [p["title"] for p in synced] == [p["title"] for p in pages]
+    http_date = {"Retry-After": "Wed, 21 Oct 2026 07:28:00 GMT"}
+    assert loader._retry_delay(httpx.Response(429, headers=http_date), 2) == 4
+    await loader.aclose()
+
+    rag = RevisionRAG(
+        None,
+        None,
+        None,
+        llm=FakeChatModel(),
+        embedding=FakeEmbeddings(),
+        qdrant_client=QdrantClient(":memory:"),
+        async_qdrant_client=AsyncQdrantClient(":memory:"),
+    )
+    start = time.perf_counter()
+    await rag.abuild_rag_from_pages(synced)
+    print(f"Built index in {time.perf_counter() - start:.2f}s")
+
+    assert len(await rag.async_retriever.ainvoke("What is a tensor?")) == 4
+    assert (await rag.aask("What is a tensor?"))["result"] == "ok"
+    await measure("aask", lambda: rag.aask("What is a tensor?"))
+
+    content = synced[0]["content"]
+    await measure(
+        "agenerate_revision_questions (per-call max_concurrency=1)",
+        lambda: rag.agenerate_revision_questions(content, max_concurrency=1),
+    )
+
+    await rag.aclose()
+    os.chdir("/")
+    workdir.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
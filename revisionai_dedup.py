@@ -0,0 +1,134 @@
+# revisionai_dedup.py
+import random
+from hashlib import md5
+from typing import Dict, List, Optional, Set, Tuple
+
+NUM_PERM = 64
+NUM_BANDS = 16  # 4 rows per band: pairs above ~0.5 Jaccard become candidates
+ROWS_PER_BAND = NUM_PERM // NUM_BANDS
+SHINGLE_SIZE = 5
+DUPLICATE_THRESHOLD = 0.85
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+
+# Signatures are persisted in the vector payloads, so the permutations must be
+# identical across runs.
+_rng = random.Random(1)
+_PERMUTATIONS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(NUM_PERM)
+]
+
+
+def minhash_signature(text: str) -> Tuple[int, ...]:
+    normalized = " ".join(text.lower().split())
+    shingles = {
+        normalized[i : i + SHINGLE_SIZE]
+        for i in range(max(len(normalized) - SHINGLE_SIZE + 1, 1))
+    }
+    hashes = [
+        int.from_bytes(md5(s.encode("utf-8")).digest()[:4], "little")
+        for s in shingles
+    ]
+    return tuple(
+        min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+        for a, b in _PERMUTATIONS
+    )
+
+
+def text_hash(text: str) -> str:
+    return md5(" ".join(text.lower().split()).encode("utf-8")).hexdigest()
+
+
+def estimate_jaccard(a: Tuple[int, ...], b: Tuple[int, ...]) -> float:
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERM
+
+
+class ChunkIndex:
+    """LSH index over stored chunks and the pages that reference each one."""
+
+    def __init__(self, threshold: float = DUPLICATE_THRESHOLD):
+        self.threshold = threshold
+        self.signatures: Dict[str, Tuple[int, ...]] = {}
+        self.page_titles: Dict[str, List[str]] = {}
+        self.text_hashes: Dict[str, str] = {}
+        self._page_points: Dict[str, Set[str]] = {}
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def _bands(self, signature: Tuple[int, ...]):
+        for band in range(NUM_BANDS):
+            start = band * ROWS_PER_BAND
+            yield band, tuple(signature[start : start + ROWS_PER_BAND])
+
+    def add(
+        self,
+        point_id: str,
+        signature: Tuple[int, ...],
+        page_titles: List[str],
+        text_hash: str,
+    ):
+        self.page_titles[point_id] = []
+        self._index_signature(point_id, signature, text_hash)
+        for title in page_titles:
+            self.add_reference(point_id, title)
+
+    def replace(self, point_id: str, signature: Tuple[int, ...], text_hash: str):
+        self._unindex_signature(point_id)
+        self._index_signature(point_id, signature, text_hash)
+
+    def remove(self, point_id: str):
+        self._unindex_signature(point_id)
+        for title in self.page_titles.pop(point_id):
+            self._page_points[title].discard(point_id)
+
+    def _index_signature(self, point_id, signature, text_hash):
+        self.signatures[point_id] = tuple(signature)
+        self.text_hashes[point_id] = text_hash
+        for band in self._bands(signature):
+            self._buckets.setdefault(band, set()).add(point_id)
+
+    def _unindex_signature(self, point_id):
+        signature = self.signatures.pop(point_id)
+        del self.text_hashes[point_id]
+        for band in self._bands(signature):
+            self._buckets[band].discard(point_id)
+
+    def add_reference(self, point_id: str, title: str) -> bool:
+        if title in self.page_titles[point_id]:
+            return False
+        self.page_titles[point_id].append(title)
+        self._page_points.setdefault(title, set()).add(point_id)
+        return True
+
+    def find_duplicate(self, signature: Tuple[int, ...]) -> Optional[str]:
+        candidates = set()
+        for band in self._bands(signature):
+            candidates |= self._buckets.get(band, set())
+
+        best, best_score = None, self.threshold
+        for point_id in candidates:
+            score = estimate_jaccard(signature, self.signatures[point_id])
+            if score >= best_score:
+                best, best_score = point_id, score
+        return best
+
+    def release_page(self, title: str, keep: Set[str]):
+        """Drop ``title`` from every point it references except those in ``keep``.
+
+        Returns the ids left with no referencing page (to delete) and the ids
+        whose page list shrank (to update).
+        """
+        orphaned, shrunk = [], []
+        for point_id in list(self._page_points.get(title, set()) - keep):
+            self.page_titles[point_id].remove(title)
+            self._page_points[title].discard(point_id)
+            if self.page_titles[point_id]:
+                shrunk.append(point_id)
+            else:
+                self.remove(point_id)
+                orphaned.append(point_id)
+        return orphaned, shrunk
@@ -1,24 +1,70 @@
 # revisionai_notion.py
 import os
 import json
+import asyncio
+import httpx
 import requests
 from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
 
 load_dotenv()
 
 CACHE_FILE = "cached_pages.json"
+# Caps requests in flight, not requests per second. Notion averages ~3 req/s
+# per integration and answers bursts above that with 429, which the async
+# client retries after the server's Retry-After delay.
+DEFAULT_MAX_CONCURRENCY = 3
+MAX_RATE_LIMIT_RETRIES = 5
 
 
 class NotionPageLoader:
-    def __init__(self, token: str):
+    def __init__(
+        self,
+        token: str,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        http_client: Optional[httpx.AsyncClient] = None,
+    ):
         self.token = token
         self.headers = {
             "Authorization": f"Bearer {token}",
             "Content-Type": "application/json",
             "Notion-Version": "2022-06-28",
         }
+        self.max_concurrency = max_concurrency
+        self._async_client: Optional[httpx.AsyncClient] = http_client
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                timeout=30.0,
+                limits=httpx.Limits(max_connections=self.max_concurrency * 2),
+            )
+        return self._async_client
+
+    async def _arequest(self, method: str, url: str, **kwargs) -> Dict[str, Any]:
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            response = await self.async_client.request(
+                method, url, headers=self.headers, **kwargs
+            )
+            if response.status_code != 429 or attempt == MAX_RATE_LIMIT_RETRIES:
+                break
+            await asyncio.sleep(self._retry_delay(response, attempt))
+        response.raise_for_status()
+        return response.json()
+
+    def _retry_delay(self, response: httpx.Response, attempt: int) -> float:
+        # Retry-After may also be an HTTP date; back off exponentially then.
+        try:
+            return float(response.headers["Retry-After"])
+        except (KeyError, ValueError):
+            return float(2**attempt)
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
 
     def get_all_page_contents(self) -> List[Dict[str, str]]:
         if os.path.exists(CACHE_FILE):
@@ -44,24 +90,62 @@ class NotionPageLoader:
         print("✅ Cached Notion pages.")
         return all_data
 
-    def search_all_pages(self) -> List[str]:
-        url = "https://api.notion.com/v1/search"
-        payload = {
+    async def arefresh_and_cache_pages(
+        self, max_concurrency: Optional[int] = None
+    ) -> List[Dict[str, str]]:
+        print("🔄 Syncing Notion pages...")
+        page_ids = await self.asearch_all_pages()
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+
+        async def load_page(page_id: str) -> Dict[str, str]:
+            async with semaphore:
+                title = await self.aget_page_title(page_id)
+                content_blocks = await self.aget_page_blocks(page_id)
+            content = "\n".join([b["text"] for b in content_blocks])
+            return {"id": page_id, "title": title, "content": content}
+
+        all_data = await asyncio.gather(*(load_page(pid) for pid in page_ids))
+
+        with open(CACHE_FILE, "w") as f:
+            json.dump(all_data, f, indent=2)
+
+        print("✅ Cached Notion pages.")
+        return all_data
+
+    def _search_payload(self) -> Dict[str, Any]:
+        return {
             "filter": {"value": "page", "property": "object"},
             "sort": {"direction": "descending", "timestamp": "last_edited_time"},
         }
-        response = requests.post(url, headers=self.headers, json=payload)
-        data = response.json()
+
+    def _page_ids_from_search(self, data: Dict[str, Any]) -> List[str]:
         return [
             result["id"]
             for result in data.get("results", [])
             if result["object"] == "page"
         ]
 
+    def search_all_pages(self) -> List[str]:
+        url = "https://api.notion.com/v1/search"
+        response = requests.post(url, headers=self.headers, json=self._search_payload())
+        return self._page_ids_from_search(response.json())
+
+    async def asearch_all_pages(self) -> List[str]:
+        url = "https://api.notion.com/v1/search"
+        data = await self._arequest("POST", url, json=self._search_payload())
+        return self._page_ids_from_search(data)
+
     def get_page_title(self, page_id: str) -> str:
         url = f"https://api.notion.com/v1/pages/{page_id}"
         response = requests.get(url, headers=self.headers)
-        data = response.json()
+        return self._title_from_page(response.json())
+
+    async def aget_page_title(self, page_id: str) -> str:
+        url = f"https://api.notion.com/v1/pages/{page_id}"
+        data = await self._arequest("GET", url)
+        return self._title_from_page(data)
+
+    def _title_from_page(self, data: Dict[str, Any]) -> str:
         props = data.get("properties", {})
         title = "Untitled"
         for prop in props.values():
@@ -86,6 +170,17 @@ class NotionPageLoader:
             )
         return results
 
+    async def aget_block_children(self, block_id: str) -> List[Dict[str, Any]]:
+        url = f"https://api.notion.com/v1/blocks/{block_id}/children"
+        params: Dict[str, str] = {}
+        results = []
+        while True:
+            data = await self._arequest("GET", url, params=params)
+            results.extend(data.get("results", []))
+            if not data.get("has_more"):
+                return results
+            params = {"start_cursor": data["next_cursor"]}
+
     def get_block_content(self, block: Dict[str, Any]) -> str:
         block_type = block.get("type", "unknown")
         block_data = block.get(block_type, {})
@@ -104,6 +199,17 @@ class NotionPageLoader:
         self, page_id: str, filter_last_edited_days: int = 0
     ) -> List[Dict[str, str]]:
         blocks = self.get_block_children(page_id)
+        return self._texts_from_blocks(blocks, filter_last_edited_days)
+
+    async def aget_page_blocks(
+        self, page_id: str, filter_last_edited_days: int = 0
+    ) -> List[Dict[str, str]]:
+        blocks = await self.aget_block_children(page_id)
+        return self._texts_from_blocks(blocks, filter_last_edited_days)
+
+    def _texts_from_blocks(
+        self, blocks: List[Dict[str, Any]], filter_last_edited_days: int
+    ) -> List[Dict[str, str]]:
         result = []
         cutoff = datetime.utcnow() - timedelta(days=filter_last_edited_days)
         for block in blocks:
@@ -1,34 +1,116 @@
 import os
 import json
+import asyncio
 import datetime
+import threading
+from contextlib import contextmanager
+from uuid import uuid4
 from hashlib import md5
 from pathlib import Path
+from typing import Any, Optional
 from dotenv import load_dotenv
 
+import httpx
 from langchain_qdrant import QdrantVectorStore
 from langchain_community.embeddings import HuggingFaceInferenceAPIEmbeddings
 from langchain.chains.retrieval_qa.base import RetrievalQA
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
 from langchain_groq import ChatGroq
 from langchain_core.runnables.history import RunnableWithMessageHistory
 from langchain_community.chat_message_histories import ChatMessageHistory
 from langchain_core.messages import AIMessage
 from langchain_core.runnables import RunnableConfig
 
-from qdrant_client import QdrantClient
+from qdrant_client import AsyncQdrantClient, QdrantClient
 from qdrant_client.models import (
     VectorParams,
     Distance,
-    Filter,
-    FieldCondition,
-    MatchValue,
+    PointIdsList,
+    PointStruct,
 )
 
+from revisionai_dedup import ChunkIndex, minhash_signature, text_hash
+from revisionai_snapshot import export_snapshot, import_snapshot
+
 load_dotenv()
 
 HASH_CACHE_FILE = "page_content_hashes.json"
 REVISION_SCHEDULE_FILE = "revision_schedule.json"
+DEFAULT_MAX_CONCURRENCY = 8
+EMBEDDING_DIM = 384
+UPSERT_BATCH_SIZE = 64
+
+
+class AsyncHuggingFaceInferenceAPIEmbeddings(HuggingFaceInferenceAPIEmbeddings):
+    """HF Inference API embeddings whose async methods use a shared httpx pool.
+
+    The base class only offers async methods by pushing the blocking
+    ``requests`` call onto a thread executor.
+    """
+
+    http_client: Any = None
+
+    async def aembed_documents(self, texts: list) -> list:
+        if self.http_client is None:
+            return await super().aembed_documents(texts)
+        response = await self.http_client.post(
+            self._api_url,
+            headers=self._headers,
+            json={
+                "inputs": texts,
+                "options": {"wait_for_model": True, "use_cache": True},
+            },
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def aembed_query(self, text: str) -> list:
+        return (await self.aembed_documents([text]))[0]
+
+
+class AsyncQdrantRetriever(BaseRetriever):
+    """Retriever that searches Qdrant through ``AsyncQdrantClient``.
+
+    Reads the same ``page_content``/``metadata`` payload QdrantVectorStore
+    writes, so both retrievers see the same collection. Sync calls go through
+    ``sync_client`` instead.
+    """
+
+    client: Any
+    sync_client: Any
+    collection_name: str
+    embedding: Any
+    k: int = 4
+
+    def _get_relevant_documents(self, query: str, *, run_manager) -> list:
+        response = self.sync_client.query_points(
+            collection_name=self.collection_name,
+            query=self.embedding.embed_query(query),
+            limit=self.k,
+            with_payload=True,
+        )
+        return self._to_documents(response.points)
+
+    async def _aget_relevant_documents(self, query: str, *, run_manager) -> list:
+        vector = await self.embedding.aembed_query(query)
+        response = await self.client.query_points(
+            collection_name=self.collection_name,
+            query=vector,
+            limit=self.k,
+            with_payload=True,
+        )
+        return self._to_documents(response.points)
+
+    def _to_documents(self, points) -> list:
+        return [
+            Document(
+                page_content=point.payload.get("page_content", ""),
+                metadata=point.payload.get("metadata", {}),
+            )
+            for point in points
+        ]
 
 
 class RevisionRAG:
@@ -38,21 +120,52 @@ class RevisionRAG:
         qdrant_url: str,
         qdrant_api_key: str,
         collection_name: str = "revisionai",
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        llm=None,
+        embedding=None,
+        qdrant_client: Optional[QdrantClient] = None,
+        async_qdrant_client: Optional[AsyncQdrantClient] = None,
     ):
         os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
-        self.embedding = HuggingFaceInferenceAPIEmbeddings(
+        # One async connection pool shared by the embedding and LLM clients;
+        # Qdrant keeps its own pool in the async client below.
+        self.http_client = httpx.AsyncClient(
+            timeout=60.0,
+            limits=httpx.Limits(max_connections=max_concurrency * 2),
+        )
+        self.max_concurrency = max_concurrency
+
+        self.embedding = embedding or AsyncHuggingFaceInferenceAPIEmbeddings(
             api_key=os.getenv("HUGGINGFACE_TOKEN"),
             model_name="sentence-transformers/all-MiniLM-L6-v2",
+            http_client=self.http_client,
         )
 
-        self.llm = ChatGroq(api_key=groq_api_key, model_name="llama3-8b-8192")
-        self.qdrant_client = QdrantClient(url=qdrant_url, api_key=qdrant_api_key)
+        self.llm = llm or ChatGroq(
+            api_key=groq_api_key,
+            model_name="llama3-8b-8192",
+            http_async_client=self.http_client,
+        )
+        self.qdrant_client = qdrant_client or QdrantClient(
+            url=qdrant_url, api_key=qdrant_api_key
+        )
+        self.async_qdrant_client = async_qdrant_client or AsyncQdrantClient(
+            url=qdrant_url, api_key=qdrant_api_key
+        )
         self.collection_name = collection_name
 
         self.content_hashes = self._load_json(HASH_CACHE_FILE)
         self.current_topic = "all"
         self.qa_with_history = None
+        self.async_qa_with_history = None
+        self.chunk_index = None
+        self.last_ingest_stats = None
+        # Sync callers (Streamlit reruns threads) serialize on the threading
+        # lock, async callers on the asyncio one. The two locks do not see
+        # each other, so don't mix sync and async ingests on one instance.
+        self._sync_ingest_lock = threading.Lock()
+        self._ingest_lock = asyncio.Lock()
 
         self._ensure_qdrant_collection()
         self._initialize_vectorstore()
@@ -75,7 +188,9 @@ class RevisionRAG:
         if self.collection_name not in [col.name for col in collections]:
             self.qdrant_client.create_collection(
                 collection_name=self.collection_name,
-                vectors_config=VectorParams(size=384, distance=Distance.COSINE),
+                vectors_config=VectorParams(
+                    size=EMBEDDING_DIM, distance=Distance.COSINE
+                ),
             )
 
     def _initialize_vectorstore(self):
@@ -86,62 +201,365 @@ class RevisionRAG:
         )
         self.retriever = self.vectorstore.as_retriever()
 
+        # QdrantVectorStore only wraps a sync client and runs its async methods
+        # in an executor, so the async path talks to AsyncQdrantClient directly.
+        self.async_retriever = AsyncQdrantRetriever(
+            client=self.async_qdrant_client,
+            sync_client=self.qdrant_client,
+            collection_name=self.collection_name,
+            embedding=self.embedding,
+        )
+
+    def _build_qa_with_history(self, retriever):
+        base_chain = RetrievalQA.from_chain_type(
+            llm=self.llm,
+            retriever=retriever,
+            chain_type="stuff",
+        )
+        return RunnableWithMessageHistory(
+            base_chain,
+            lambda session_id: ChatMessageHistory(),
+            input_messages_key="query",
+            history_messages_key="history",
+        )
+
     def _ensure_qa_with_history(self):
         if self.qa_with_history is None:
-            base_chain = RetrievalQA.from_chain_type(
-                llm=self.llm,
-                retriever=self.retriever,
-                chain_type="stuff",
-            )
-            self.qa_with_history = RunnableWithMessageHistory(
-                base_chain,
-                lambda session_id: ChatMessageHistory(),
-                input_messages_key="query",
-                history_messages_key="history",
+            self.qa_with_history = self._build_qa_with_history(self.retriever)
+
+    def _ensure_async_qa_with_history(self):
+        if self.async_qa_with_history is None:
+            self.async_qa_with_history = self._build_qa_with_history(
+                self.async_retriever
             )
 
+    async def _gather_limited(self, coros, max_concurrency: Optional[int] = None):
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
+
+        async def run(coro):
+            async with semaphore:
+                return await coro
+
+        return await asyncio.gather(*(run(coro) for coro in coros))
+
+    async def _aadd_documents(self, docs, ids):
+        vectors = await self.embedding.aembed_documents(
+            [doc.page_content for doc in docs]
+        )
+        await self.async_qdrant_client.upsert(
+            collection_name=self.collection_name,
+            points=[
+                PointStruct(
+                    id=point_id,
+                    vector=vector,
+                    payload={
+                        "page_content": doc.page_content,
+                        "metadata": doc.metadata,
+                    },
+                )
+                for point_id, doc, vector in zip(ids, docs, vectors)
+            ],
+        )
+
+    async def aclose(self):
+        await self.http_client.aclose()
+        await self.async_qdrant_client.close()
+
+    @contextmanager
+    def _reset_chunk_index_on_error(self):
+        # Planning updates the in-memory index before Qdrant is written, so a
+        # failed write leaves it ahead of the collection; rebuild it next time.
+        try:
+            yield
+        except Exception:
+            self.chunk_index = None
+            raise
+
     def build_rag_from_pages(self, pages: list):
-        updated, unchanged = 0, 0
+        with self._sync_ingest_lock:
+            self._ensure_chunk_index()
+            with self._reset_chunk_index_on_error():
+                plan = self._plan_ingest(pages)
+                self._apply_plan(plan)
+
+            self._finish_ingest(plan, len(pages))
+        self._ensure_qa_with_history()
+        return len(plan["changed"]) > 0
+
+    async def abuild_rag_from_pages(
+        self, pages: list, max_concurrency: Optional[int] = None
+    ):
+        async with self._ingest_lock:
+            await self._aensure_chunk_index()
+            with self._reset_chunk_index_on_error():
+                # MinHash planning is CPU-bound; keep it off the event loop.
+                plan = await asyncio.to_thread(self._plan_ingest, pages)
+                await self._aapply_plan(plan, max_concurrency)
+
+            self._finish_ingest(plan, len(pages))
+        self._ensure_async_qa_with_history()
+        return len(plan["changed"]) > 0
+
+    def delete_page(self, title: str):
+        with self._sync_ingest_lock:
+            self._ensure_chunk_index()
+            with self._reset_chunk_index_on_error():
+                plan = self._plan_delete(title)
+                self._apply_plan(plan)
+            self._forget_page(title, plan)
+
+    async def adelete_page(self, title: str, max_concurrency: Optional[int] = None):
+        async with self._ingest_lock:
+            await self._aensure_chunk_index()
+            with self._reset_chunk_index_on_error():
+                plan = self._plan_delete(title)
+                await self._aapply_plan(plan, max_concurrency)
+            self._forget_page(title, plan)
+
+    def _apply_plan(self, plan):
+        for point_id, doc in zip(plan["ids"], plan["docs"]):
+            doc.metadata.update(self._page_titles_payload(point_id))
+        if plan["delete"]:
+            self.qdrant_client.delete(
+                collection_name=self.collection_name,
+                points_selector=PointIdsList(points=list(plan["delete"])),
+            )
+        if plan["docs"]:
+            self.vectorstore.add_documents(plan["docs"], ids=plan["ids"])
+        for point_id in plan["update"]:
+            self.qdrant_client.set_payload(
+                collection_name=self.collection_name,
+                payload=self._page_titles_payload(point_id),
+                key="metadata",
+                points=[point_id],
+            )
+
+    async def _aapply_plan(self, plan, max_concurrency: Optional[int] = None):
+        for point_id, doc in zip(plan["ids"], plan["docs"]):
+            doc.metadata.update(self._page_titles_payload(point_id))
+        if plan["delete"]:
+            await self.async_qdrant_client.delete(
+                collection_name=self.collection_name,
+                points_selector=PointIdsList(points=list(plan["delete"])),
+            )
+        await self._gather_limited(
+            (
+                self._aadd_documents(
+                    plan["docs"][i : i + UPSERT_BATCH_SIZE],
+                    plan["ids"][i : i + UPSERT_BATCH_SIZE],
+                )
+                for i in range(0, len(plan["docs"]), UPSERT_BATCH_SIZE)
+            ),
+            max_concurrency,
+        )
+        await self._gather_limited(
+            (
+                self.async_qdrant_client.set_payload(
+                    collection_name=self.collection_name,
+                    payload=self._page_titles_payload(point_id),
+                    key="metadata",
+                    points=[point_id],
+                )
+                for point_id in plan["update"]
+            ),
+            max_concurrency,
+        )
+
+    def _ensure_chunk_index(self):
+        if self.chunk_index is None:
+            self.chunk_index = ChunkIndex()
+            offset = None
+            while True:
+                points, offset = self.qdrant_client.scroll(
+                    collection_name=self.collection_name,
+                    limit=256,
+                    offset=offset,
+                    with_payload=True,
+                )
+                self._index_points(points)
+                if offset is None:
+                    break
+
+    async def _aensure_qdrant_collection(self):
+        if not await self.async_qdrant_client.collection_exists(self.collection_name):
+            await self.async_qdrant_client.create_collection(
+                collection_name=self.collection_name,
+                vectors_config=VectorParams(
+                    size=EMBEDDING_DIM, distance=Distance.COSINE
+                ),
+            )
+
+    async def _aensure_chunk_index(self):
+        if self.chunk_index is None:
+            await self._aensure_qdrant_collection()
+            self.chunk_index = ChunkIndex()
+            offset = None
+            while True:
+                points, offset = await self.async_qdrant_client.scroll(
+                    collection_name=self.collection_name,
+                    limit=256,
+                    offset=offset,
+                    with_payload=True,
+                )
+                await asyncio.to_thread(self._index_points, points)
+                if offset is None:
+                    break
+
+    def _index_points(self, points):
+        for point in points:
+            payload = point.payload or {}
+            metadata = payload.get("metadata", {})
+            text = payload.get("page_content", "")
+            # Points written before deduplication carry neither field.
+            signature = metadata.get("minhash") or minhash_signature(text)
+            titles = metadata.get("page_titles") or [metadata.get("page_title")]
+            self.chunk_index.add(point.id, signature, titles, text_hash(text))
+
+    def _page_titles_payload(self, point_id):
+        titles = self.chunk_index.page_titles[point_id]
+        return {"page_title": titles[0], "page_titles": list(titles)}
+
+    def _new_plan(self):
+        return {
+            "changed": [],
+            "delete": set(),
+            "update": set(),
+            "docs": [],
+            "ids": [],
+            "created": set(),
+            "chunks": 0,
+            "reused": 0,
+            "replaced": 0,
+            "deduplicated": 0,
+            "saved_chars": 0,
+        }
+
+    def _plan_ingest(self, pages):
+        plan = self._new_plan()
         for page in pages:
             title, content = page["title"], page["content"]
             content_hash = self._compute_content_hash(content)
 
             if self.content_hashes.get(title) == content_hash:
                 print(f"🔁 No changes detected for page: {title}")
-                unchanged += 1
                 continue
 
-            self._refresh_page(title, content)
-            self.content_hashes[title] = content_hash
-            updated += 1
+            self._plan_page(plan, title, content)
+            plan["changed"].append((title, content_hash))
 
-        self._save_json(HASH_CACHE_FILE, self.content_hashes)
-        print(f"✅ Updated {updated} pages, {unchanged} pages unchanged")
-        self._ensure_qa_with_history()
-        return updated > 0
+        # New and replaced points get their final page list at upsert time,
+        # and deleted points need no payload update.
+        plan["update"] -= plan["delete"] | set(plan["ids"])
+        return plan
 
-    def _refresh_page(self, title, content):
+    def _plan_page(self, plan, title, content):
         print(f"⚙️ Updating vectors for page: {title}")
 
-        self.qdrant_client.delete(
-            collection_name=self.collection_name,
-            points_selector=Filter(
-                must=[FieldCondition(key="page_title", match=MatchValue(value=title))]
-            ),
+        index = self.chunk_index
+        keep = set()
+        docs = self._split_page(title, content)
+        for doc in docs:
+            signature = minhash_signature(doc.page_content)
+            chunk_hash = text_hash(doc.page_content)
+            point_id = index.find_duplicate(signature)
+
+            if point_id is not None and index.text_hashes[point_id] == chunk_hash:
+                if point_id in plan["created"]:
+                    self._plan_reference(plan, point_id, title, doc)
+                elif title in index.page_titles[point_id]:
+                    plan["reused"] += 1
+                else:
+                    self._plan_reference(plan, point_id, title, doc)
+            elif point_id is None or point_id in keep:
+                # Nothing close, or only a different chunk of this same page.
+                point_id = str(uuid4())
+                index.add(point_id, signature, [title], chunk_hash)
+                self._plan_upsert(plan, point_id, doc, signature)
+                plan["created"].add(point_id)
+            elif index.page_titles[point_id] == [title]:
+                # An edit of a chunk only this page uses: overwrite the old point
+                # so corrected notes replace the stale text and vector.
+                index.replace(point_id, signature, chunk_hash)
+                self._plan_upsert(plan, point_id, doc, signature)
+                plan["replaced"] += 1
+            else:
+                # Other pages share this point; rewriting it would change their
+                # text, so this page keeps mapping onto the canonical copy.
+                self._plan_reference(plan, point_id, title, doc)
+            keep.add(point_id)
+
+        orphaned, shrunk = index.release_page(title, keep)
+        plan["delete"].update(orphaned)
+        plan["update"].update(shrunk)
+        plan["chunks"] += len(docs)
+
+    def _plan_reference(self, plan, point_id, title, doc):
+        if self.chunk_index.add_reference(point_id, title):
+            plan["update"].add(point_id)
+        plan["deduplicated"] += 1
+        plan["saved_chars"] += len(doc.page_content)
+
+    def _plan_upsert(self, plan, point_id, doc, signature):
+        doc.metadata["minhash"] = list(signature)
+        plan["docs"].append(doc)
+        plan["ids"].append(point_id)
+
+    def _plan_delete(self, title):
+        print(f"🗑️ Removing page from vectorstore: {title}")
+        plan = self._new_plan()
+        orphaned, shrunk = self.chunk_index.release_page(title, set())
+        plan["delete"].update(orphaned)
+        plan["update"].update(shrunk)
+        return plan
+
+    def _forget_page(self, title, plan):
+        self.content_hashes.pop(title, None)
+        self._save_json(HASH_CACHE_FILE, self.content_hashes)
+        print(
+            f"✅ Removed page: {title} ({len(plan['delete'])} vectors deleted, "
+            f"{len(plan['update'])} shared vectors kept)"
         )
 
+    def _finish_ingest(self, plan, total_pages):
+        for title, content_hash in plan["changed"]:
+            self.content_hashes[title] = content_hash
+        self._save_json(HASH_CACHE_FILE, self.content_hashes)
+
+        updated = len(plan["changed"])
+        # Only duplicates avoid storing a vector; a page reusing its own chunks
+        # from an earlier ingest saves embedding calls but no storage.
+        self.last_ingest_stats = {
+            "pages_updated": updated,
+            "pages_unchanged": total_pages - updated,
+            "chunks": plan["chunks"],
+            "chunks_embedded": len(plan["docs"]),
+            "chunks_replaced": plan["replaced"],
+            "chunks_reused": plan["reused"],
+            "chunks_deduplicated": plan["deduplicated"],
+            "embedding_chars_saved": plan["saved_chars"],
+            "vector_bytes_saved": plan["deduplicated"] * EMBEDDING_DIM * 4,
+            "points_deleted": len(plan["delete"]),
+        }
+
+        print(f"✅ Updated {updated} pages, {total_pages - updated} pages unchanged")
+        if plan["chunks"]:
+            print(
+                f"♻️ Deduplicated {plan['deduplicated']}/{plan['chunks']} chunks: "
+                f"skipped {plan['saved_chars']} chars of embedding, "
+                f"~{self.last_ingest_stats['vector_bytes_saved'] // 1024} KB of "
+                f"vectors; reused {plan['reused']} unchanged chunks "
+                f"({len(self.chunk_index)} stored)"
+            )
+
+    def _split_page(self, title, content):
         splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
         chunks = splitter.split_text(content)
 
-        docs = [
+        return [
             Document(page_content=chunk, metadata={"page_title": title})
             for chunk in chunks
         ]
 
-        self.vectorstore.add_documents(docs)
-
-        print(f"✅ Refreshed page in vectorstore: {title} ({len(docs)} chunks)")
-
     def ask(self, question: str, session_id: str = "default"):
         self._ensure_qa_with_history()
         config: RunnableConfig = {
@@ -154,13 +572,64 @@ class RevisionRAG:
             return result["answer"]
         return result
 
-    def generate_revision_questions(self, content: str) -> str:
+    def export_snapshot(self, path: str, pages: list = None, dtype: str = "float32"):
+        return export_snapshot(
+            self.qdrant_client,
+            self.collection_name,
+            path,
+            content_hashes=self.content_hashes,
+            schedule=self._load_json(REVISION_SCHEDULE_FILE) or [],
+            pages=pages,
+            dtype=dtype,
+            embedding_model=self.embedding.model_name,
+        )
+
+    def import_snapshot(
+        self,
+        path: str,
+        pages: list = None,
+        batch_size: int = 256,
+        parallel: int = 4,
+    ):
+        manifest = import_snapshot(
+            self.qdrant_client,
+            self.collection_name,
+            path,
+            pages=pages,
+            embedding_model=self.embedding.model_name,
+            batch_size=batch_size,
+            parallel=parallel,
+        )
+
+        # Vectors, hashes and schedule come from the same file, so restore all
+        # three together to keep page_content_hashes.json in step with Qdrant.
+        self.content_hashes = manifest["content_hashes"]
+        self.chunk_index = None
+        self._save_json(HASH_CACHE_FILE, self.content_hashes)
+        self._save_json(REVISION_SCHEDULE_FILE, manifest["schedule"])
+        self._ensure_qa_with_history()
+        return manifest
+
+    async def aask(self, question: str, session_id: str = "default"):
+        self._ensure_async_qa_with_history()
+        config: RunnableConfig = {
+            "configurable": {"session_id": session_id},
+        }
+
+        result = await self.async_qa_with_history.ainvoke(
+            {"query": question}, config=config
+        )
+
+        if isinstance(result, dict) and "answer" in result:
+            return result["answer"]
+        return result
+
+    def _revision_question_prompts(self, content: str) -> list:
         splitter = RecursiveCharacterTextSplitter(chunk_size=1500, chunk_overlap=100)
         chunks = splitter.split_text(content)
-        all_questions = []
 
-        for chunk in chunks:
-            prompt = (
+        return [
+            (
                 "Generate the following types of revision questions based on the content below:\n"
                 "1. 3 Multiple Choice Questions\n"
                 "2. 3 One Word Answer Questions\n"
@@ -169,6 +638,13 @@ class RevisionRAG:
                 "5. If the content is code-related, generate a 'Explain the Code' question\n"
                 f"\nContent:\n{chunk}\n"
             )
+            for chunk in chunks
+        ]
+
+    def generate_revision_questions(self, content: str) -> str:
+        all_questions = []
+
+        for prompt in self._revision_question_prompts(content):
             response = self.llm.invoke(prompt)
             all_questions.append(
                 response.content if isinstance(response, AIMessage) else str(response)
@@ -176,6 +652,22 @@ class RevisionRAG:
 
         return "\n\n".join(all_questions)
 
+    async def agenerate_revision_questions(
+        self, content: str, max_concurrency: Optional[int] = None
+    ) -> str:
+        responses = await self._gather_limited(
+            (
+                self.llm.ainvoke(prompt)
+                for prompt in self._revision_question_prompts(content)
+            ),
+            max_concurrency,
+        )
+
+        return "\n\n".join(
+            response.content if isinstance(response, AIMessage) else str(response)
+            for response in responses
+        )
+
     def extract_topic_from_title(self, title: str) -> str:
         if ":" in title:
             return title.split(":")[0].strip().lower()
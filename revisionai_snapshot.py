@@ -0,0 +1,291 @@
+# revisionai_snapshot.py
+import json
+import zipfile
+import datetime
+from hashlib import md5, sha256
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.models import VectorParams, Distance, PointIdsList
+
+SNAPSHOT_FORMAT = "revisionai-snapshot"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_DTYPES = ("float32", "float16", "int8")
+
+MANIFEST_ENTRY = "manifest.json"
+MANIFEST_CHECKSUM_ENTRY = "manifest.sha256"
+CHUNKS_ENTRY = "chunks.json"
+EMBEDDINGS_ENTRY = "embeddings.bin"
+SCALES_ENTRY = "scales.bin"
+
+
+class SnapshotError(ValueError):
+    pass
+
+
+def _encode_vectors(vectors: np.ndarray, dtype: str):
+    if dtype == "float32":
+        return vectors.astype("<f4"), None
+    if dtype == "float16":
+        return vectors.astype("<f2"), None
+    # int8: symmetric per-vector scale, dequantised as q * scale on import
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.round(vectors / scales[:, None]).clip(-127, 127).astype("i1")
+    return quantized, scales.astype("<f4")
+
+
+def _decode_vectors(blob: bytes, scales: Optional[bytes], manifest: Dict[str, Any]):
+    dtype = manifest["dtype"]
+    storage = {"float32": "<f4", "float16": "<f2", "int8": "i1"}[dtype]
+    raw = np.frombuffer(blob, dtype=storage)
+    if raw.size != manifest["count"] * manifest["dim"]:
+        raise SnapshotError("Embeddings size does not match manifest")
+    vectors = raw.reshape(manifest["count"], manifest["dim"]).astype(np.float32)
+    if dtype == "int8":
+        vectors *= np.frombuffer(scales, dtype="<f4")[:, None]
+    return vectors
+
+
+def _scroll_points(
+    client: QdrantClient,
+    collection_name: str,
+    batch_size: int,
+    with_data: bool = True,
+):
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=batch_size,
+            offset=offset,
+            with_payload=with_data,
+            with_vectors=with_data,
+        )
+        yield from points
+        if offset is None:
+            return
+
+
+def export_snapshot(
+    client: QdrantClient,
+    collection_name: str,
+    path: str,
+    content_hashes: Dict[str, str],
+    schedule: Optional[List[Dict[str, str]]] = None,
+    pages: Optional[List[Dict[str, str]]] = None,
+    dtype: str = "float32",
+    embedding_model: Optional[str] = None,
+    batch_size: int = 256,
+) -> Dict[str, Any]:
+    if dtype not in SNAPSHOT_DTYPES:
+        raise SnapshotError(f"Unsupported snapshot dtype: {dtype}")
+
+    chunks, vectors = [], []
+    for point in _scroll_points(client, collection_name, batch_size):
+        payload = point.payload or {}
+        chunks.append(
+            {
+                "id": point.id,
+                "page_title": payload.get("metadata", {}).get("page_title"),
+                "text": payload.get("page_content", ""),
+                "metadata": payload.get("metadata", {}),
+            }
+        )
+        vectors.append(point.vector)
+    if not chunks:
+        raise SnapshotError(f"Collection is empty: {collection_name}")
+
+    page_ids = {p["title"]: p.get("id") for p in pages or []}
+    chunk_counts = _count_chunks_by_page(chunks)
+    missing = sorted(set(chunk_counts) - set(content_hashes))
+    if missing:
+        raise SnapshotError(f"No content hash recorded for pages: {missing}")
+    page_entries = [
+        {"id": page_ids.get(title), "title": title, "chunks": count}
+        for title, count in chunk_counts.items()
+    ]
+
+    matrix = np.asarray(vectors, dtype=np.float32).reshape(len(chunks), -1)
+    encoded, scales = _encode_vectors(matrix, dtype)
+    blob = encoded.tobytes()
+
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "version": SNAPSHOT_VERSION,
+        "created": datetime.datetime.now().isoformat(),
+        "collection": collection_name,
+        "embedding_model": embedding_model,
+        "distance": Distance.COSINE.value,
+        "dim": matrix.shape[1],
+        "count": len(chunks),
+        "dtype": dtype,
+        "pages": page_entries,
+        "content_hashes": content_hashes,
+        "schedule": schedule or [],
+    }
+
+    entries = {CHUNKS_ENTRY: json.dumps(chunks).encode("utf-8"), EMBEDDINGS_ENTRY: blob}
+    if scales is not None:
+        entries[SCALES_ENTRY] = scales.tobytes()
+    manifest["checksums"] = {
+        name: sha256(data).hexdigest() for name, data in entries.items()
+    }
+    manifest_blob = json.dumps(manifest, indent=2).encode("utf-8")
+
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr(MANIFEST_ENTRY, manifest_blob)
+        zf.writestr(MANIFEST_CHECKSUM_ENTRY, sha256(manifest_blob).hexdigest())
+        for name, data in entries.items():
+            # Vector blobs barely compress; store them as-is.
+            compress_type = (
+                zipfile.ZIP_DEFLATED if name == CHUNKS_ENTRY else zipfile.ZIP_STORED
+            )
+            zf.writestr(name, data, compress_type=compress_type)
+
+    print(f"📦 Exported snapshot: {path} ({len(chunks)} chunks, {dtype})")
+    return manifest
+
+
+def _count_chunks_by_page(chunks: List[Dict]) -> Dict[str, int]:
+    # A deduplicated chunk counts toward every page that references it, not
+    # just the first one recorded in page_title.
+    counts: Dict[str, int] = {}
+    for chunk in chunks:
+        titles = chunk.get("metadata", {}).get("page_titles") or [chunk["page_title"]]
+        for title in titles:
+            counts[title] = counts.get(title, 0) + 1
+    return counts
+
+
+def load_snapshot(
+    path: str, pages: Optional[List[Dict[str, str]]] = None
+) -> Dict[str, Any]:
+    with zipfile.ZipFile(path, "r") as zf:
+        manifest_blob = zf.read(MANIFEST_ENTRY)
+        expected = zf.read(MANIFEST_CHECKSUM_ENTRY).decode("utf-8").strip()
+        if sha256(manifest_blob).hexdigest() != expected:
+            raise SnapshotError("Manifest checksum mismatch")
+
+        manifest = json.loads(manifest_blob)
+        if manifest.get("format") != SNAPSHOT_FORMAT:
+            raise SnapshotError(f"Not a RevisionAI snapshot: {path}")
+        if manifest.get("version") != SNAPSHOT_VERSION:
+            raise SnapshotError(
+                f"Unsupported snapshot version: {manifest.get('version')}"
+            )
+
+        required = {CHUNKS_ENTRY, EMBEDDINGS_ENTRY}
+        if manifest["dtype"] == "int8":
+            required.add(SCALES_ENTRY)
+        if not required <= set(manifest["checksums"]):
+            raise SnapshotError("Snapshot is missing required entries")
+        entries = {name: zf.read(name) for name in manifest["checksums"]}
+
+    for name, data in entries.items():
+        if sha256(data).hexdigest() != manifest["checksums"][name]:
+            raise SnapshotError(f"Checksum mismatch for {name}")
+
+    chunks = json.loads(entries[CHUNKS_ENTRY])
+    _verify_snapshot(manifest, chunks, pages)
+    return {
+        "manifest": manifest,
+        "chunks": chunks,
+        "vectors": _decode_vectors(
+            entries[EMBEDDINGS_ENTRY], entries.get(SCALES_ENTRY), manifest
+        ),
+    }
+
+
+def _verify_snapshot(
+    manifest: Dict[str, Any],
+    chunks: List[Dict],
+    pages: Optional[List[Dict[str, str]]],
+):
+    if len(chunks) != manifest["count"]:
+        raise SnapshotError("Chunk count does not match manifest")
+
+    expected = {page["title"]: page["chunks"] for page in manifest["pages"]}
+    if _count_chunks_by_page(chunks) != expected:
+        raise SnapshotError("Chunks per page do not match manifest")
+
+    # The snapshot's own hashes only agree with themselves; checking them
+    # against the page contents being restored catches a stale snapshot.
+    content_hashes = manifest["content_hashes"]
+    for page in pages or []:
+        title = page["title"]
+        if title not in content_hashes:
+            continue
+        if md5(page["content"].encode("utf-8")).hexdigest() != content_hashes[title]:
+            raise SnapshotError(f"Snapshot is stale for page: {title}")
+
+
+def import_snapshot(
+    client: QdrantClient,
+    collection_name: str,
+    path: str,
+    pages: Optional[List[Dict[str, str]]] = None,
+    embedding_model: Optional[str] = None,
+    batch_size: int = 256,
+    parallel: int = 4,
+) -> Dict[str, Any]:
+    snapshot = load_snapshot(path, pages)
+    manifest, chunks = snapshot["manifest"], snapshot["chunks"]
+    if embedding_model and manifest["embedding_model"] not in (None, embedding_model):
+        raise SnapshotError(
+            f"Snapshot was embedded with {manifest['embedding_model']}, "
+            f"not {embedding_model}"
+        )
+
+    vectors_config = VectorParams(
+        size=manifest["dim"], distance=Distance(manifest["distance"])
+    )
+    if not client.collection_exists(collection_name):
+        client.create_collection(
+            collection_name=collection_name, vectors_config=vectors_config
+        )
+    else:
+        existing = client.get_collection(collection_name).config.params.vectors
+        if not isinstance(existing, VectorParams) or (
+            existing.size,
+            existing.distance,
+        ) != (vectors_config.size, vectors_config.distance):
+            raise SnapshotError(
+                f"Collection {collection_name} does not match snapshot vectors "
+                f"({manifest['dim']}, {manifest['distance']})"
+            )
+
+        # Points outside the snapshot would outlive the hashes it restores.
+        snapshot_ids = {chunk["id"] for chunk in chunks}
+        stale = [
+            point.id
+            for point in _scroll_points(client, collection_name, batch_size, False)
+            if point.id not in snapshot_ids
+        ]
+        if stale:
+            client.delete(
+                collection_name=collection_name,
+                points_selector=PointIdsList(points=stale),
+            )
+
+    client.upload_collection(
+        collection_name=collection_name,
+        vectors=snapshot["vectors"],
+        payload=(
+            {
+                "page_content": chunk["text"],
+                "metadata": chunk.get(
+                    "metadata", {"page_title": chunk["page_title"]}
+                ),
+            }
+            for chunk in chunks
+        ),
+        ids=[chunk["id"] for chunk in chunks],
+        batch_size=batch_size,
+        parallel=parallel,
+        wait=True,
+    )
+
+    print(f"✅ Imported snapshot: {path} ({len(chunks)} chunks)")
+    return manifest
@@ -0,0 +1,226 @@
+# verify_dedup.py
+"""Near-duplicate ingest checks against in-memory Qdrant, no API keys."""
+import os
+import time
+import random
+import asyncio
+import tempfile
+import threading
+
+from qdrant_client import AsyncQdrantClient, QdrantClient
+
+from load_test import FakeChatModel, FakeEmbeddings
+from revisionai_rag import RevisionRAG
+from revisionai_snapshot import load_snapshot
+
+WORDS = "array string vector tree graph heap stack queue hash sort search node".split()
+
+
+def paragraph(seed):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(60))
+
+
+def page(title, *paragraphs):
+    return {"title": title, "content": "\n\n".join(paragraphs)}
+
+
+def make_rag(**clients):
+    return RevisionRAG(
+        None, None, None, llm=FakeChatModel(), embedding=FakeEmbeddings(), **clients
+    )
+
+
+def stored_points(client):
+    points, _ = client.scroll("revisionai", limit=10_000)
+    return {p.id: p.payload for p in points}
+
+
+def check_consistent(rag, points):
+    """The in-memory index must match what is actually stored in Qdrant."""
+    assert set(points) == set(rag.chunk_index.page_titles)
+    for point_id, payload in points.items():
+        titles = rag.chunk_index.page_titles[point_id]
+        assert payload["metadata"]["page_titles"] == titles
+
+
+def texts_for(points, title):
+    return [
+        p["page_content"]
+        for p in points.values()
+        if title in p["metadata"]["page_titles"]
+    ]
+
+
+def main():
+    workdir = tempfile.TemporaryDirectory()
+    os.chdir(workdir.name)
+
+    shared = paragraph("shared")
+    edited = paragraph("edited") + " runs in O(n) time"
+    arrays = page("Arrays", paragraph(1), shared, edited)
+    questions = page("Array Questions", paragraph(2), shared + " stl")
+
+    client = QdrantClient(":memory:")
+    rag = make_rag(qdrant_client=client)
+
+    rag.build_rag_from_pages([arrays, questions])
+    stats = rag.last_ingest_stats
+    assert stats["chunks_deduplicated"] == 1, stats
+    assert stats["vector_bytes_saved"] > 0 and stats["chunks_reused"] == 0
+    points = stored_points(client)
+    assert len(points) == stats["chunks"] - 1
+    check_consistent(rag, points)
+    print("✅ cross-page near-duplicate stored once")
+
+    # Sync invoke on the async retriever goes through the sync client.
+    assert len(rag.async_retriever.invoke(shared)) == 4
+    print("✅ async retriever answers sync invoke")
+
+    # A small correction must replace the stored text, not map onto it.
+    fixed = page("Arrays", paragraph(1), shared, edited.replace("O(n)", "O(log n)"))
+    rag.build_rag_from_pages([fixed, questions])
+    stats = rag.last_ingest_stats
+    assert stats["chunks_replaced"] == 1 and stats["chunks_reused"] == 2, stats
+    assert stats["chunks_deduplicated"] == 0 and stats["vector_bytes_saved"] == 0
+    points = stored_points(client)
+    arrays_texts = texts_for(points, "Arrays")
+    assert any("O(log n)" in t for t in arrays_texts)
+    assert not any("O(n)" in t for t in arrays_texts)
+    check_consistent(rag, points)
+    print("✅ edited chunk replaced in place, unchanged chunks reused")
+
+    rag.delete_page("Arrays")
+    points = stored_points(client)
+    assert texts_for(points, "Arrays") == []
+    assert len(texts_for(points, "Array Questions")) == 2
+    assert "Arrays" not in rag.content_hashes
+    check_consistent(rag, points)
+    rag.delete_page("Array Questions")
+    assert stored_points(client) == {}
+    print("✅ delete_page keeps shared vectors until the last page goes")
+
+    # A failed write must not leave the index ahead of the collection.
+    original_add = rag.vectorstore.add_documents
+
+    def failing_add(*args, **kwargs):
+        raise RuntimeError("qdrant unavailable")
+
+    rag.vectorstore.add_documents = failing_add
+    try:
+        rag.build_rag_from_pages([arrays])
+    except RuntimeError:
+        pass
+    assert rag.chunk_index is None
+    rag.vectorstore.add_documents = original_add
+    rag.build_rag_from_pages([arrays, questions])
+    points = stored_points(client)
+    assert len(texts_for(points, "Arrays")) == 3
+    check_consistent(rag, points)
+    print("✅ failed write resets the index and the retry stores every chunk")
+
+    check_shared_points()
+    check_threaded_ingest()
+    asyncio.run(check_async())
+
+    os.chdir("/")
+    workdir.cleanup()
+
+
+def check_shared_points():
+    client = QdrantClient(":memory:")
+    rag = make_rag(qdrant_client=client)
+
+    # Exact repeats inside one new page are duplicates, not reuse.
+    repeated = paragraph("repeated")
+    rag.build_rag_from_pages([page("Repeats", repeated, repeated, repeated)])
+    stats = rag.last_ingest_stats
+    assert stats["chunks_embedded"] == 1 and stats["chunks_reused"] == 0, stats
+    assert stats["chunks_deduplicated"] == 2 and stats["vector_bytes_saved"] > 0
+    print("✅ in-page repeats counted as deduplicated on first build")
+
+    # Editing a page that only maps onto a shared point must not rewrite it.
+    complexity = paragraph("complexity") + " runs in O(log n) time"
+    arrays = page("Arrays", paragraph(3), complexity)
+    variant = complexity.replace("O(log n)", "O(n)")
+    rag.build_rag_from_pages([arrays, page("Array Questions", paragraph(4), variant)])
+    assert rag.last_ingest_stats["chunks_deduplicated"] == 1
+    for seed in (5, 6):
+        rag.build_rag_from_pages(
+            [arrays, page("Array Questions", paragraph(seed), variant)]
+        )
+        stats = rag.last_ingest_stats
+        assert stats["chunks_replaced"] == 0 and stats["chunks_deduplicated"] == 1
+        points = stored_points(client)
+        arrays_texts = texts_for(points, "Arrays")
+        assert any("O(log n)" in t for t in arrays_texts)
+        assert not any("O(n)" in t for t in arrays_texts)
+        check_consistent(rag, points)
+    print("✅ shared point keeps its text when another referencing page changes")
+
+    # A page whose only chunk is shared still appears in a snapshot.
+    only_shared = page("Only Shared", complexity)
+    rag.build_rag_from_pages([only_shared])
+    manifest = rag.export_snapshot("dedup.zip")
+    counts = {p["title"]: p["chunks"] for p in manifest["pages"]}
+    assert counts["Only Shared"] == 1 and counts["Arrays"] == 2, counts
+    assert counts["Array Questions"] == 2 and counts["Repeats"] == 1, counts
+    load_snapshot("dedup.zip", [arrays, only_shared])
+    print("✅ snapshot counts chunks for every page that references them")
+
+
+def check_threaded_ingest():
+    client = QdrantClient(":memory:")
+    rag = make_rag(qdrant_client=client)
+    pages = [page(f"Page {i}", paragraph(i), paragraph("shared")) for i in range(8)]
+
+    threads = [
+        threading.Thread(target=rag.build_rag_from_pages, args=([p],)) for p in pages
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    points = stored_points(client)
+    assert len(points) == 9, len(points)
+    check_consistent(rag, points)
+    print("✅ concurrent sync ingests leave the index consistent")
+
+
+async def check_async():
+    rag = make_rag(
+        qdrant_client=QdrantClient(":memory:"),
+        async_qdrant_client=AsyncQdrantClient(":memory:"),
+    )
+    pages = [
+        page(f"Page {i}", *(paragraph(i * 100 + j) for j in range(40)))
+        for i in range(5)
+    ]
+
+    max_gap, stop = 0.0, asyncio.Event()
+
+    async def ticker():
+        nonlocal max_gap
+        last = time.perf_counter()
+        while not stop.is_set():
+            await asyncio.sleep(0.005)
+            now = time.perf_counter()
+            max_gap, last = max(max_gap, now - last), now
+
+    tick = asyncio.create_task(ticker())
+    await rag.abuild_rag_from_pages(pages)
+    stop.set()
+    await tick
+    assert rag.last_ingest_stats["chunks_embedded"] == 200
+    assert max_gap < 0.3, f"event loop blocked for {max_gap:.2f}s"
+    print(f"✅ async ingest kept the event loop responsive ({max_gap * 1000:.0f} ms)")
+
+    await rag.adelete_page("Page 0")
+    points, _ = await rag.async_qdrant_client.scroll("revisionai", limit=10_000)
+    assert len(points) == 160
+    await rag.aclose()
+    print("✅ adelete_page removed the page's vectors")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# verify_snapshot.py
+"""Snapshot export -> import round trip against in-memory Qdrant, no API keys."""
+import os
+import json
+import zipfile
+import tempfile
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.models import PointStruct, VectorParams, Distance
+
+from load_test import FakeChatModel, FakeEmbeddings
+from revisionai_rag import (
+    EMBEDDING_DIM,
+    HASH_CACHE_FILE,
+    REVISION_SCHEDULE_FILE,
+    RevisionRAG,
+)
+from revisionai_snapshot import SnapshotError, import_snapshot, load_snapshot
+
+
+def make_rag(client):
+    return RevisionRAG(
+        None,
+        None,
+        None,
+        llm=FakeChatModel(),
+        embedding=FakeEmbeddings(),
+        qdrant_client=client,
+    )
+
+
+def all_points(client):
+    points, _ = client.scroll("revisionai", limit=10_000, with_vectors=True)
+    return {point.id: point for point in points}
+
+
+def rewrite_entry(src, dst, name, transform):
+    with zipfile.ZipFile(src) as zin, zipfile.ZipFile(dst, "w") as zout:
+        for item in zin.infolist():
+            data = zin.read(item.filename)
+            zout.writestr(item, transform(data) if item.filename == name else data)
+
+
+def expect_error(label, fn):
+    try:
+        fn()
+    except SnapshotError as e:
+        print(f"  ✅ {label}: {e}")
+    else:
+        raise AssertionError(f"{label}: no SnapshotError raised")
+
+
+def main():
+    with open(os.path.join(os.path.dirname(__file__), "cached_pages.json")) as f:
+        pages = json.load(f)
+
+    workdir = tempfile.TemporaryDirectory()
+    os.chdir(workdir.name)
+
+    source_client = QdrantClient(":memory:")
+    source = make_rag(source_client)
+    source.build_rag_from_pages(pages)
+    source_points = all_points(source_client)
+    source_hashes = dict(source.content_hashes)
+
+    for dtype, tolerance in (("float32", 1e-6), ("float16", 1e-3), ("int8", 1e-2)):
+        path = f"snapshot-{dtype}.zip"
+        source._save_json(REVISION_SCHEDULE_FILE, [])
+        source.export_snapshot(path, pages, dtype=dtype)
+
+        # The target holds a leftover point and an unrelated schedule.
+        target_client = QdrantClient(":memory:")
+        target = make_rag(target_client)
+        target_client.upsert(
+            "revisionai",
+            [PointStruct(id=1, vector=[0.1] * EMBEDDING_DIM, payload={})],
+        )
+        target._save_json(REVISION_SCHEDULE_FILE, [{"page_title": "old"}])
+        target.import_snapshot(path, pages=pages)
+
+        target_points = all_points(target_client)
+        assert set(target_points) == set(source_points), "point ids differ"
+        for point_id, point in source_points.items():
+            restored = target_points[point_id]
+            assert restored.payload == point.payload
+            assert np.allclose(restored.vector, point.vector, atol=tolerance)
+        assert target._load_json(HASH_CACHE_FILE) == source_hashes
+        assert target._load_json(REVISION_SCHEDULE_FILE) == []
+        print(f"✅ {dtype}: {len(target_points)} points restored")
+
+    print("\nIntegrity checks")
+    path = "snapshot-int8.zip"
+    for name, label in (
+        ("scales.bin", "corrupted int8 scales"),
+        ("chunks.json", "edited chunk metadata"),
+        ("manifest.json", "edited manifest"),
+    ):
+        rewrite_entry(path, "bad.zip", name, lambda d: d[:-2] + b"}}")
+        expect_error(label, lambda: load_snapshot("bad.zip"))
+
+    edited = [dict(p) for p in pages]
+    edited[0]["content"] += "\nnew note"
+    expect_error("stale page contents", lambda: load_snapshot(path, edited))
+
+    mismatched = QdrantClient(":memory:")
+    mismatched.create_collection(
+        "revisionai", vectors_config=VectorParams(size=8, distance=Distance.DOT)
+    )
+    expect_error(
+        "mismatched collection",
+        lambda: import_snapshot(mismatched, "revisionai", path),
+    )
+
+    os.chdir("/")
+    workdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()